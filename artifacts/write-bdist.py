@@ -21,11 +21,13 @@
 from __future__ import annotations
 
 import argparse
+import os
 from pathlib import Path, PurePath
 import re
 from typing import BinaryIO
 
 from common.archive import (
+    COMPRESSION_PROFILES,
     ArchiveWriter,
     FileMember,
     SymlinkMember,
@@ -40,9 +42,25 @@ from common.software import Project
 class Args(TypedArgs):
     artifacts: list[Path]
     output: BinaryIO
+    jobs: int
+    profile: str
 
 
 args = Args('write-bdist', description='Write bdist archive.')
+args.add_arg(
+    '-j',
+    '--jobs',
+    type=int,
+    default=os.cpu_count() or 1,
+    help='number of compression threads',
+)
+args.add_arg(
+    '-p',
+    '--profile',
+    choices=COMPRESSION_PROFILES,
+    default='release',
+    help='compression profile',
+)
 args.add_arg(
     '-o',
     '--output',
@@ -60,9 +78,13 @@ args.add_arg(
 args.parse()
 
 if meson_host() == 'windows':
-    arc: ArchiveWriter = ZipArchiveWriter(args.output)
+    arc: ArchiveWriter = ZipArchiveWriter(
+        args.output, threads=args.jobs, profile=args.profile
+    )
 else:
-    arc = TarArchiveWriter(args.output)
+    arc = TarArchiveWriter(
+        args.output, threads=args.jobs, profile=args.profile
+    )
 with arc:
     for path in args.artifacts:
         name = path.name
@@ -83,7 +105,7 @@ with arc:
         if path.is_dir():
             arc.add_tree(arcdir, path)
         else:
-            arc.add(FileMember(arcdir / name, path.open('rb')))
+            arc.add(FileMember.from_path(arcdir / name, path))
             if re.search('\\.so(\\.[0-9]+){3}$', name):
                 for pat in '(\\.[0-9]+){2}$', '(\\.[0-9]+)+$':
                     lname = re.sub(pat, '', name)
@@ -94,8 +116,10 @@ with arc:
 
     # special case: copy OpenSlide README to root
     arc.add(
-        FileMember(
+        FileMember.from_path(
             arc.base / 'README.md',
-            open(Project.get('openslide').source_dir / 'README.md', 'rb'),
+            Project.get('openslide').source_dir / 'README.md',
         )
     )
+if arc.dedup_count:
+    print(arc.dedup_report())
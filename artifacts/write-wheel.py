@@ -21,7 +21,6 @@
 from __future__ import annotations
 
 import argparse
-from contextlib import ExitStack
 from email.message import Message
 from io import BytesIO
 import os
@@ -30,7 +29,7 @@ import re
 import subprocess
 from typing import BinaryIO
 
-from common.archive import FileMember, WheelWriter
+from common.archive import COMPRESSION_PROFILES, FileMember, WheelWriter
 from common.argparse import TypedArgs
 from common.meson import meson_host
 from common.python import pyproject_to_message
@@ -39,9 +38,25 @@ from common.python import pyproject_to_message
 class Args(TypedArgs):
     artifacts: list[Path]
     output: BinaryIO
+    jobs: int
+    profile: str
 
 
 args = Args('write-wheel', description='Write Python wheel.')
+args.add_arg(
+    '-j',
+    '--jobs',
+    type=int,
+    default=os.cpu_count() or 1,
+    help='number of compression threads',
+)
+args.add_arg(
+    '-p',
+    '--profile',
+    choices=COMPRESSION_PROFILES,
+    default='release',
+    help='compression profile',
+)
 args.add_arg(
     '-o',
     '--output',
@@ -58,38 +73,37 @@ args.add_arg(
 )
 args.parse()
 
-with ExitStack() as inputs:
-    with WheelWriter(args.output) as whl:
-        for path in args.artifacts:
-            if path.is_file():
-                fh = inputs.enter_context(path.open('rb'))
-            if path.name == 'pyproject.toml':
-                meta = pyproject_to_message(fh.read().decode())
+with WheelWriter(args.output, threads=args.jobs, profile=args.profile) as whl:
+    for path in args.artifacts:
+        if path.name == 'pyproject.toml':
+            meta = pyproject_to_message(path.read_bytes().decode())
+            whl.add(
+                FileMember(whl.metadir / 'METADATA', BytesIO(meta.as_bytes()))
+            )
+        elif path.name in ('COPYING.LESSER', 'licenses'):
+            # Assume the file or dir is in the root of the sdist.
+            # Write licenses directory to {metadir}/licenses/licenses,
+            # as required by PEP 639.
+            if path.is_dir():
+                whl.add_tree(whl.metadir / 'licenses', path)
+            else:
                 whl.add(
-                    FileMember(
-                        whl.metadir / 'METADATA', BytesIO(meta.as_bytes())
+                    FileMember.from_path(
+                        whl.metadir / 'licenses' / path.name, path
                     )
                 )
-            elif path.name in ('COPYING.LESSER', 'licenses'):
-                # Assume the file or dir is in the root of the sdist.
-                # Write licenses directory to {metadir}/licenses/licenses,
-                # as required by PEP 639.
-                if path.is_dir():
-                    whl.add_tree(whl.metadir / 'licenses', path)
-                else:
-                    whl.add(
-                        FileMember(whl.metadir / 'licenses' / path.name, fh)
-                    )
-            else:
-                name = re.sub('(\\.so\\.[0-9]+)\\.[0-9.]+', '\\1', path.name)
-                whl.add(FileMember(whl.datadir / name, fh))
+        else:
+            name = re.sub('(\\.so\\.[0-9]+)\\.[0-9.]+', '\\1', path.name)
+            whl.add(FileMember.from_path(whl.datadir / name, path))
 
-        meta = Message()
-        meta['Wheel-Version'] = '1.0'
-        meta['Generator'] = 'openslide-bin'
-        meta['Root-Is-Purelib'] = 'false'
-        meta['Tag'] = whl.tag
-        whl.add(FileMember(whl.metadir / 'WHEEL', BytesIO(meta.as_bytes())))
+    meta = Message()
+    meta['Wheel-Version'] = '1.0'
+    meta['Generator'] = 'openslide-bin'
+    meta['Root-Is-Purelib'] = 'false'
+    meta['Tag'] = whl.tag
+    whl.add(FileMember(whl.metadir / 'WHEEL', BytesIO(meta.as_bytes())))
+if whl.dedup_count:
+    print(whl.dedup_report())
 
 if meson_host() == 'linux':
     report = subprocess.check_output(
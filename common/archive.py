@@ -21,22 +21,81 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from base64 import urlsafe_b64encode
-from collections.abc import Iterable, Iterator, Sequence
+from collections import Counter, deque
+from collections.abc import Buffer, Callable, Iterable, Iterator, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import ExitStack, contextmanager
 import copy
 from dataclasses import dataclass
-from functools import cached_property
 from hashlib import sha256
+import io
 from io import BytesIO
-from itertools import zip_longest
-from pathlib import Path, PurePath
+import lzma
+import mmap
+import os
+from pathlib import Path, PurePath, PurePosixPath
 import re
+import shutil
+import stat
+import struct
 import tarfile
 import tempfile
 import time
 from types import TracebackType
-from typing import BinaryIO, Self, cast
+from typing import IO, Any, BinaryIO, Self, cast
+import weakref
 import zipfile
+import zlib
+
+# uncompressed size of each independently compressed xz Stream when
+# compressing in parallel
+_XZ_BLOCK_SIZE = 8 << 20
+# amount of each xz Stream to decompress when looking for a tar header
+_XZ_PEEK_SIZE = 64 << 10
+# chunk size for streaming file members
+_COPY_BUFSIZE = 1 << 20
+# size above which spooled members are written to disk
+_SPOOL_SIZE = 16 << 20
+# largest tar member kept in memory as a possible hardlink target
+_LINK_TARGET_CACHE_SIZE = 1 << 20
+# LZMA2 dictionary size of each xz preset, from xz(1)
+_XZ_PRESET_DICT_SIZES = (
+    256 << 10,
+    1 << 20,
+    2 << 20,
+    4 << 20,
+    4 << 20,
+    8 << 20,
+    8 << 20,
+    16 << 20,
+    32 << 20,
+    64 << 20,
+)
+
+
+@dataclass(frozen=True)
+class CompressionProfile:
+    # xz preset for tar archives
+    xz_preset: int
+    # zlib level for Zip archives, or None to store uncompressed
+    zip_level: int | None
+    # approximate size of independent xz Streams, which can be compressed
+    # in parallel, or None to write a single Stream
+    xz_block_size: int | None = _XZ_BLOCK_SIZE
+
+
+COMPRESSION_PROFILES = {
+    # smallest archives, for distribution.  Splitting tar.xz archives into
+    # Streams would make them about 1% larger, so compress them serially.
+    'release': CompressionProfile(
+        xz_preset=9, zip_level=9, xz_block_size=None
+    ),
+    # quick compression for local builds
+    'fast': CompressionProfile(xz_preset=1, zip_level=1),
+    # fastest possible; the xz container can't store data uncompressed,
+    # so use the cheapest preset
+    'store': CompressionProfile(xz_preset=0, zip_level=None),
+}
 
 
 @dataclass
@@ -56,6 +115,74 @@ class Member(ABC):
 @dataclass
 class FileMember(Member):
     fh: BinaryIO
+    # size, permission bits, and modification time, if fh isn't an open
+    # file on disk
+    size: int | None = None
+    mode: int | None = None
+    mtime: float | None = None
+
+    @classmethod
+    def from_path(cls, path: PurePath, src: Path) -> Self:
+        """Create a member backed by a file on disk, which is opened only
+        while it's being read."""
+        return cls(path, cast(BinaryIO, _LazyFile(src)))
+
+    def release(self) -> None:
+        """Close the underlying file, if it can be transparently reopened
+        later."""
+        if isinstance(self.fh, _LazyFile):
+            self.fh.release()
+
+    def digest(self) -> bytes:
+        """Return the SHA-256 digest of the contents."""
+        digest = _file_digest(self.fh)
+        self.release()
+        return digest
+
+    def peek(self, size: int) -> bytes:
+        """Return up to size bytes from the start of the contents."""
+        data = self.fh.read(size)
+        self.fh.seek(0)
+        return data
+
+    def materialize(self, dir: Path) -> Path:
+        """Copy the contents to a new file in dir, for consumers that need
+        a real path, and return its path."""
+        path = Path(tempfile.mkdtemp(dir=dir)) / self.path.name
+        with path.open('wb') as fh:
+            shutil.copyfileobj(self.fh, fh, _COPY_BUFSIZE)
+        self.fh.seek(0)
+        return path
+
+    def stat(self) -> tuple[int, int | None, float]:
+        """Return the size, permission bits (if known), and modification
+        time of the contents."""
+        size = self.size
+        mode = self.mode
+        mtime = self.mtime
+        if isinstance(self.fh, _LazyFile):
+            # avoid opening the file
+            st = self.fh.path.stat()
+            size = st.st_size if size is None else size
+        else:
+            if size is None:
+                size = self.fh.seek(0, os.SEEK_END)
+                self.fh.seek(0)
+            st = None
+            # calling fileno() on a SpooledTemporaryFile would roll it over
+            # to disk
+            if (mode is None or mtime is None) and not isinstance(
+                self.fh, tempfile.SpooledTemporaryFile
+            ):
+                try:
+                    st = os.fstat(self.fh.fileno())
+                except (AttributeError, OSError):
+                    # in-memory file
+                    pass
+        if st is not None:
+            mode = st.st_mode & 0o7777 if mode is None else mode
+            mtime = st.st_mtime if mtime is None else mtime
+        return size, mode, mtime if mtime is not None else time.time()
 
 
 @dataclass
@@ -72,6 +199,16 @@ class ArchiveWriter(ABC):
     def __init__(self, path: Path):
         self.base = _path_base(path)
         self._members: dict[PurePath, Member] = {}
+        # file members not stored separately because their contents
+        # duplicate another member, and the bytes saved
+        self.dedup_count = 0
+        self.dedup_bytes = 0
+        # For reproducible archives, use SOURCE_DATE_EPOCH as the time of
+        # generated members and clamp file mtimes to it.
+        # https://reproducible-builds.org/specs/source-date-epoch/
+        epoch = os.environ.get('SOURCE_DATE_EPOCH')
+        self._epoch = int(epoch) if epoch else None
+        self._now = self._epoch if self._epoch is not None else time.time()
 
     def __enter__(self) -> Self:
         return self
@@ -104,39 +241,113 @@ class ArchiveWriter(ABC):
         for dpath, _, fnames in path.walk(on_error=walkerr):
             for fname in fnames:
                 self.add(
-                    FileMember(
+                    FileMember.from_path(
                         arcdir / dpath.relative_to(path.parent) / fname,
-                        open(dpath / fname, 'rb'),
+                        dpath / fname,
                     )
                 )
 
+    def _clamp_mtime(self, mtime: float) -> float:
+        if self._epoch is not None:
+            return min(int(mtime), self._epoch)
+        return mtime
+
+    def dedup_report(self) -> str:
+        return (
+            f'{self.base}: deduplicated {self.dedup_count} members '
+            f'totaling {self.dedup_bytes} bytes'
+        )
+
+    def _link_mode(self, mode: int | None) -> int | None:
+        """Return the permission bits which must match for a file member
+        to be deduplicated against another.  Writers which store duplicates
+        as hardlinks override this, since all links to a file share its
+        permission bits."""
+        return None
+
+    def _find_duplicates(self) -> dict[PurePath, FileMember]:
+        """Map the path of each file member whose contents duplicate an
+        earlier member, in sorted order, to the earlier member.  Only
+        members whose size and _link_mode() match another member are
+        hashed."""
+        by_stat: dict[tuple[int, int | None], list[FileMember]] = {}
+        for _, member in sorted(self._members.items()):
+            if isinstance(member, FileMember):
+                size, mode, _ = member.stat()
+                by_stat.setdefault((size, self._link_mode(mode)), []).append(
+                    member
+                )
+        duplicates: dict[PurePath, FileMember] = {}
+        for (size, _), members in by_stat.items():
+            if size == 0 or len(members) < 2:
+                continue
+            by_digest: dict[bytes, FileMember] = {}
+            for member in members:
+                first = by_digest.setdefault(member.digest(), member)
+                if first is not member:
+                    duplicates[member.path] = first
+                    self.dedup_count += 1
+                    self.dedup_bytes += size
+        return duplicates
+
 
 class TarArchiveWriter(ArchiveWriter):
-    def __init__(self, fh: BinaryIO):
+    def __init__(
+        self, fh: BinaryIO, threads: int = 1, profile: str = 'release'
+    ):
         super().__init__(Path(fh.name))
+        settings = COMPRESSION_PROFILES[profile]
+        self._xz: _XZWriter | _XZSingleWriter
+        if settings.xz_block_size is None:
+            self._xz = _XZSingleWriter(fh, preset=settings.xz_preset)
+        else:
+            self._xz = _XZWriter(
+                fh,
+                preset=settings.xz_preset,
+                threads=threads,
+                block_size=settings.xz_block_size,
+            )
         self._tar = tarfile.open(
-            fileobj=fh,
-            mode='w:xz',
+            fileobj=cast(BinaryIO, self._xz),
+            mode='w',
             format=tarfile.PAX_FORMAT,
-            preset=9,
         )
-        self._now = int(time.time())
+
+    @staticmethod
+    def _file_mode(mode: int | None) -> int:
+        return (mode or 0) & ~0o022 | 0o644
+
+    def _link_mode(self, mode: int | None) -> int:
+        return self._file_mode(mode)
 
     def close(self) -> None:
+        duplicates = self._find_duplicates()
         for _, member in sorted(self._members.items()):
+            # allow a new xz Stream to start here, so readers can find the
+            # member's header without decompressing earlier Streams
+            self._xz.member_boundary()
             if isinstance(member, FileMember):
-                info = self._tar.gettarinfo(
-                    arcname=member.path.as_posix(), fileobj=member.fh
-                )
-                info.mode = info.mode & ~0o022 | 0o644
+                info = tarfile.TarInfo(member.path.as_posix())
+                info.size, mode, mtime = member.stat()
+                info.mtime = self._clamp_mtime(mtime)
+                info.mode = self._file_mode(mode)
                 info.uid = 0
                 info.gid = 0
                 info.uname = 'root'
                 info.gname = 'root'
-                self._tar.addfile(info, member.fh)
+                first = duplicates.get(member.path)
+                if first is not None:
+                    # store a hardlink to the earlier copy
+                    info.type = tarfile.LNKTYPE
+                    info.linkname = first.path.as_posix()
+                    info.size = 0
+                    self._tar.addfile(info)
+                else:
+                    self._tar.addfile(info, member.fh)
+                member.release()
             elif isinstance(member, DirMember):
                 info = tarfile.TarInfo(member.path.as_posix())
-                info.mtime = self._now
+                info.mtime = int(self._now)
                 info.mode = 0o755
                 info.type = tarfile.DIRTYPE
                 info.uname = 'root'
@@ -144,7 +355,7 @@ class TarArchiveWriter(ArchiveWriter):
                 self._tar.addfile(info)
             elif isinstance(member, SymlinkMember):
                 info = tarfile.TarInfo(member.path.as_posix())
-                info.mtime = self._now
+                info.mtime = int(self._now)
                 info.mode = 0o777
                 info.type = tarfile.SYMTYPE
                 info.linkname = member.target.as_posix()
@@ -152,37 +363,326 @@ class TarArchiveWriter(ArchiveWriter):
                 info.gname = 'root'
                 self._tar.addfile(info)
         self._tar.close()
+        self._xz.close()
+
+
+class _XZWriter:
+    """Write-only file object that compresses its input as a series of
+    independent xz Streams, compressing up to `threads` Streams at once.
+    Concatenated Streams are a valid .xz file, and can be decompressed by
+    any xz implementation.
+
+    A new Stream starts at the first member boundary after block_size
+    bytes, or unconditionally after twice that, so most Streams begin with
+    a tar header.  TarArchiveReader.read_member() uses this to seek
+    directly to a member."""
+
+    def __init__(
+        self,
+        fh: BinaryIO,
+        preset: int,
+        threads: int,
+        block_size: int = _XZ_BLOCK_SIZE,
+    ):
+        self._fh = fh
+        self._block_size = block_size
+        # the dictionary never needs to be larger than a Stream, but
+        # shouldn't be larger than the preset would use
+        self._filters = [
+            {
+                'id': lzma.FILTER_LZMA2,
+                'preset': preset,
+                'dict_size': min(
+                    _XZ_PRESET_DICT_SIZES[preset & ~lzma.PRESET_EXTREME],
+                    2 * block_size,
+                ),
+            }
+        ]
+        self._executor = ThreadPoolExecutor(threads)
+        # bound memory use by limiting the number of blocks in flight
+        self._max_pending = 2 * threads
+        self._pending: deque[Future[bytes]] = deque()
+        self._buf = bytearray()
+        self._pos = 0
+        self._blocks = 0
+
+    def write(self, data: bytes) -> int:
+        self._buf += data
+        self._pos += len(data)
+        limit = 2 * self._block_size
+        while len(self._buf) >= limit:
+            self._submit(bytes(self._buf[:limit]))
+            del self._buf[:limit]
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def member_boundary(self) -> None:
+        if len(self._buf) >= self._block_size:
+            self._submit(bytes(self._buf))
+            self._buf.clear()
+
+    def close(self) -> None:
+        if self._buf or not self._blocks:
+            self._submit(bytes(self._buf))
+            self._buf.clear()
+        while self._pending:
+            self._fh.write(self._pending.popleft().result())
+        self._executor.shutdown()
+
+    def _submit(self, block: bytes) -> None:
+        self._pending.append(
+            self._executor.submit(
+                lzma.compress,
+                block,
+                format=lzma.FORMAT_XZ,
+                check=lzma.CHECK_CRC64,
+                filters=self._filters,
+            )
+        )
+        self._blocks += 1
+        while len(self._pending) > self._max_pending:
+            self._fh.write(self._pending.popleft().result())
+
+
+class _XZSingleWriter:
+    """Write-only file object that compresses its input as a single xz
+    Stream in the calling thread, with the preset's full dictionary size.
+    Has the same interface as _XZWriter."""
+
+    def __init__(self, fh: BinaryIO, preset: int):
+        self._fh = fh
+        self._compressor = lzma.LZMACompressor(
+            format=lzma.FORMAT_XZ, check=lzma.CHECK_CRC64, preset=preset
+        )
+        self._pos = 0
+
+    def write(self, data: bytes) -> int:
+        self._fh.write(self._compressor.compress(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def member_boundary(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self._fh.write(self._compressor.flush())
+
+
+# ZipFile internals used by ZipArchiveWriter._write_compressed()
+_ZIPFILE_INTERNALS = (
+    'NameToInfo',
+    '_allowZip64',
+    '_didModify',
+    '_lock',
+    '_seekable',
+    '_writecheck',
+    '_writing',
+    'filelist',
+    'fp',
+    'start_dir',
+)
 
 
 class ZipArchiveWriter(ArchiveWriter):
-    def __init__(self, fh: BinaryIO):
+    def __init__(
+        self, fh: BinaryIO, threads: int = 1, profile: str = 'release'
+    ):
         super().__init__(Path(fh.name))
         self._zip = zipfile.ZipFile(fh, 'w')
+        # fail loudly if _write_compressed() can't work with this Python
+        missing = [
+            attr for attr in _ZIPFILE_INTERNALS if not hasattr(self._zip, attr)
+        ]
+        if missing:
+            raise Exception(
+                'Unsupported zipfile implementation; missing '
+                + ', '.join(missing)
+            )
+        self._threads = threads
+        self._level = COMPRESSION_PROFILES[profile].zip_level
 
     def close(self) -> None:
-        for _, member in sorted(self._members.items()):
-            if isinstance(member, FileMember):
-                try:
-                    info: str | zipfile.ZipInfo = zipfile.ZipInfo.from_file(
-                        member.fh.name, member.path
-                    )
-                except AttributeError:
-                    info = member.path.as_posix()
-                self._zip.writestr(
-                    info,
-                    member.fh.read(),
-                    compress_type=zipfile.ZIP_DEFLATED,
-                    compresslevel=9,
-                )
-            elif isinstance(member, DirMember):
-                self._zip.writestr(member.path.as_posix() + '/', b'')
-            elif isinstance(member, SymlinkMember):
-                raise Exception('Symlinks not supported in Zip')
+        self._write_members()
         self._zip.close()
 
+    def _write_members(self) -> None:
+        # Compress file members in parallel (zlib releases the GIL), then
+        # write them in order.  Bound the number of members in flight to
+        # bound disk and memory use.  Zip has no hardlinks, but duplicate
+        # members can reuse the compressed data of the first copy.
+        duplicates = self._find_duplicates()
+        # number of members still to be written from each compressed copy
+        uses = Counter(
+            duplicates[path].path if path in duplicates else path
+            for path, member in self._members.items()
+            if isinstance(member, FileMember)
+        )
+        futures: dict[PurePath, Future[_Compressed]] = {}
+        with ThreadPoolExecutor(self._threads) as executor:
+            pending: deque[tuple[Member, Future[_Compressed] | None, bool]] = (
+                deque()
+            )
+            for _, member in sorted(self._members.items()):
+                future: Future[_Compressed] | None = None
+                last = False
+                if isinstance(member, FileMember):
+                    first = duplicates.get(member.path, member)
+                    if first is member:
+                        futures[member.path] = executor.submit(
+                            self._compress, member
+                        )
+                    future = futures[first.path]
+                    uses[first.path] -= 1
+                    last = not uses[first.path]
+                    if last:
+                        del futures[first.path]
+                pending.append((member, future, last))
+                while len(pending) > 2 * self._threads:
+                    self._write_member(*pending.popleft())
+            while pending:
+                self._write_member(*pending.popleft())
+
+    def _write_member(
+        self, member: Member, future: Future[_Compressed] | None, last: bool
+    ) -> None:
+        if isinstance(member, FileMember):
+            assert future is not None
+            compressed = future.result()
+            self._write_compressed(member, compressed)
+            if last:
+                compressed.data.close()
+        elif isinstance(member, DirMember):
+            info = zipfile.ZipInfo(
+                member.path.as_posix() + '/', self._date_time(self._now)
+            )
+            # match the defaults of ZipFile.writestr()
+            info.external_attr = 0o40775 << 16 | 0x10
+            self._zip.writestr(info, b'')
+        elif isinstance(member, SymlinkMember):
+            raise Exception('Symlinks not supported in Zip')
+
+    def _date_time(self, mtime: float) -> tuple[int, int, int, int, int, int]:
+        if self._epoch is not None:
+            # don't depend on the build machine's time zone
+            date_time = time.gmtime(self._clamp_mtime(mtime))[:6]
+        else:
+            date_time = time.localtime(mtime)[:6]
+        # the earliest time Zip can represent
+        return max(date_time, (1980, 1, 1, 0, 0, 0))
+
+    def _compress(
+        self,
+        member: FileMember,
+        callback: Callable[[bytes], object] | None = None,
+    ) -> _Compressed:
+        """Stream a file member through the compressor, rather than reading
+        it into memory.  If specified, call callback with each chunk of the
+        contents.  Called on a worker thread."""
+        # same compressor as zipfile uses for ZIP_DEFLATED
+        compressor = (
+            zlib.compressobj(self._level, zlib.DEFLATED, -15)
+            if self._level is not None
+            else None
+        )
+        data = tempfile.SpooledTemporaryFile(
+            _SPOOL_SIZE, prefix='openslide-bin-'
+        )
+        crc = 0
+        size = 0
+        while buf := member.fh.read(_COPY_BUFSIZE):
+            data.write(compressor.compress(buf) if compressor else buf)
+            crc = zlib.crc32(buf, crc)
+            size += len(buf)
+            if callback is not None:
+                callback(buf)
+        member.release()
+        if compressor is not None:
+            data.write(compressor.flush())
+        return _Compressed(crc, size, data)
+
+    def _write_compressed(
+        self, member: FileMember, compressed: _Compressed
+    ) -> None:
+        """Write a file member compressed by _compress().  zipfile has no
+        API for adding precompressed data, so do what ZipFile.open(info,
+        'w') would have done, knowing the CRC and sizes up front.  The
+        result is byte-identical.
+
+        This uses ZipFile internals, mirroring ZipFile._open_to_write() and
+        _ZipWriteFile.close() as of CPython 3.12 through 3.14.  __init__()
+        checks that the internals exist, but recheck this code against new
+        Python versions."""
+        _, mode, mtime = member.stat()
+        info = zipfile.ZipInfo(member.path.as_posix(), self._date_time(mtime))
+        if mode is not None:
+            info.external_attr = (stat.S_IFREG | mode) << 16
+        else:
+            # match the defaults of ZipFile.writestr()
+            info.external_attr = 0o600 << 16
+        info.compress_type = (
+            zipfile.ZIP_DEFLATED
+            if self._level is not None
+            else zipfile.ZIP_STORED
+        )
+        info.flag_bits = 0
+        info.CRC = compressed.crc
+        info.file_size = compressed.size
+        info.compress_size = compressed.data.seek(0, os.SEEK_END)
+        # Compressed size can be larger than uncompressed size.  Zipfile
+        # guesses from the uncompressed size and fails in close() if the
+        # guess was wrong; we know both sizes, so use Zip64 if either
+        # needs it.
+        zip64 = (
+            info.file_size * 1.05 > zipfile.ZIP64_LIMIT
+            or info.compress_size > zipfile.ZIP64_LIMIT
+        )
+
+        zf = cast(Any, self._zip)
+        if zip64 and not zf._allowZip64:
+            raise zipfile.LargeZipFile(
+                'Filesize would require ZIP64 extensions'
+            )
+        with zf._lock:
+            if zf._writing:
+                raise ValueError(
+                    "Can't write to the Zip file while another write handle "
+                    'is open'
+                )
+            fp = zf.fp
+            if fp is None:
+                raise ValueError('Attempt to write to closed Zip file')
+            if zf._seekable:
+                fp.seek(zf.start_dir)
+            info.header_offset = fp.tell()
+            # validates the mode and name, and the limits on Zip64
+            zf._writecheck(info)
+            zf._didModify = True
+            fp.write(info.FileHeader(zip64))
+            compressed.data.seek(0)
+            shutil.copyfileobj(compressed.data, fp, _COPY_BUFSIZE)
+            zf.start_dir = fp.tell()
+            zf.filelist.append(info)
+            zf.NameToInfo[info.filename] = info
+
+
+@dataclass
+class _Compressed:
+    crc: int
+    size: int
+    data: tempfile.SpooledTemporaryFile[bytes]
+    # urlsafe base64 SHA-256 of the contents, if computed
+    digest: str | None = None
+
 
 class WheelWriter(ZipArchiveWriter):
-    def __init__(self, fh: BinaryIO):
+    def __init__(
+        self, fh: BinaryIO, threads: int = 1, profile: str = 'release'
+    ):
         (
             self.package,
             self.version,
@@ -194,51 +694,109 @@ class WheelWriter(ZipArchiveWriter):
         self.datadir = PurePath(self.package)
         self.metadir = PurePath(f'{self.package}-{self.version}.dist-info')
         self._records: list[str] = []
-        super().__init__(fh)
+        super().__init__(fh, threads, profile)
 
-    def add(self, member: Member) -> None:
-        if isinstance(member, FileMember):
-            contents = member.fh.read()
-            member.fh.seek(0)
-            hash = (
-                urlsafe_b64encode(sha256(contents).digest())
-                .decode()
-                .rstrip('=')
-            )
-            self._records.append(
-                f'{member.path.as_posix()},sha256={hash},{len(contents)}'
-            )
-        super().add(member)
-
-    def __exit__(
-        self,
-        exc_type: type[BaseException] | None,
-        exc_val: BaseException | None,
-        exc_tb: TracebackType | None,
-    ) -> None:
+    def close(self) -> None:
+        self._write_members()
+        # RECORD lists the hashes of every other member, so it's written
+        # last
         record_path = self.metadir / 'RECORD'
         self._records.append(f'{record_path.as_posix()},,')
         record_data = '\n'.join(sorted(self._records)) + '\n'
-        super().add(FileMember(record_path, BytesIO(record_data.encode())))
-        return super().__exit__(exc_type, exc_val, exc_tb)
+        record = FileMember(record_path, BytesIO(record_data.encode()))
+        compressed = super()._compress(record)
+        with compressed.data:
+            super()._write_compressed(record, compressed)
+        self._zip.close()
+
+    def _compress(
+        self,
+        member: FileMember,
+        callback: Callable[[bytes], object] | None = None,
+    ) -> _Compressed:
+        # hash while compressing, so each member is only read once
+        hash = sha256()
+
+        def update(buf: bytes) -> None:
+            hash.update(buf)
+            if callback is not None:
+                callback(buf)
+
+        compressed = super()._compress(member, update)
+        compressed.digest = (
+            urlsafe_b64encode(hash.digest()).decode().rstrip('=')
+        )
+        return compressed
+
+    def _write_compressed(
+        self, member: FileMember, compressed: _Compressed
+    ) -> None:
+        super()._write_compressed(member, compressed)
+        self._records.append(
+            f'{member.path.as_posix()},sha256={compressed.digest},'
+            f'{compressed.size}'
+        )
 
 
 class ArchiveReader(ABC):
     def __init__(self, path: Path):
         self.base = _path_base(path)
-        self._tempdir = tempfile.TemporaryDirectory(prefix='openslide-bin-')
-        self._dir = Path(self._tempdir.name)
 
     @classmethod
     @contextmanager
-    def group(cls, fhs: Iterable[BinaryIO]) -> Iterator[Iterator[MemberSet]]:
+    def group(
+        cls,
+        fhs: Iterable[BinaryIO],
+        key: Callable[[Member], PurePath] = lambda member: member.relpath,
+    ) -> Iterator[Iterator[MemberSet]]:
+        """Read several archives together, yielding a MemberSet for each
+        group of members with the same key.  Archives can list their
+        members in different orders.  After reading all archives, raise
+        an exception listing all members not present in every archive."""
         with ExitStack() as stack:
             readers = [
                 # mypy thinks we're initializing this ABC, not a subclass
                 stack.enter_context(cls(fh))  # type: ignore[arg-type]
                 for fh in fhs
             ]
-            yield (MemberSet(members) for members in zip_longest(*readers))
+            yield cls._join(readers, key)
+
+    @staticmethod
+    def _join(
+        readers: Sequence[ArchiveReader], key: Callable[[Member], PurePath]
+    ) -> Iterator[MemberSet]:
+        # Read the archives round-robin, so when their order agrees, only a
+        # few incomplete groups are pending at once.
+        pending: dict[PurePath, list[Member | None]] = {}
+        iters = {i: iter(reader) for i, reader in enumerate(readers)}
+        while iters:
+            for i, it in list(iters.items()):
+                member = next(it, None)
+                if member is None:
+                    del iters[i]
+                    continue
+                k = key(member)
+                group = pending.setdefault(k, [None] * len(readers))
+                if group[i] is not None:
+                    raise Exception(f'Duplicate member: {member.path}')
+                group[i] = member
+                if all(group):
+                    del pending[k]
+                    yield MemberSet(cast(list[Member], group))
+
+        if pending:
+            problems = []
+            for k, group in sorted(pending.items()):
+                missing = ', '.join(
+                    str(readers[i].base)
+                    for i, member in enumerate(group)
+                    if member is None
+                )
+                problems.append(f'  {k} missing from {missing}')
+            raise Exception(
+                'Members missing from one or more archives:\n'
+                + '\n'.join(problems)
+            )
 
     def __enter__(self) -> Self:
         return self
@@ -253,22 +811,52 @@ class ArchiveReader(ABC):
 
     @abstractmethod
     def close(self) -> None:
-        self._tempdir.cleanup()
+        pass
 
     @abstractmethod
     def __iter__(self) -> Iterator[Member]:
         pass
 
+    @staticmethod
+    @abstractmethod
+    def read_member(fh: BinaryIO, path: PurePath) -> bytes:
+        """Read a single file member, without reading the whole
+        archive."""
+        pass
+
 
 class TarArchiveReader(ArchiveReader):
     def __init__(self, fh: BinaryIO):
         super().__init__(Path(fh.name))
-        self._tar = tarfile.open(fileobj=fh)
-        self._tar.extraction_filter = tarfile.data_filter
+        self._path = fh.name
+        # Read the archive as a stream, without seeking.  tarfile's own
+        # stream decompressor stops after the first xz Stream, so use
+        # LZMAFile, which reads concatenated Streams.
+        self._xz = lzma.LZMAFile(fh)
+        self._tar = tarfile.open(fileobj=self._xz, mode='r|')
+        # member contents still referenced by a consumer, closed with the
+        # reader
+        self._files: weakref.WeakSet[tempfile.SpooledTemporaryFile[bytes]] = (
+            weakref.WeakSet()
+        )
+        # Possible hardlink targets.  We don't know in advance which
+        # members will be linked, so keep the contents of small members,
+        # such as license files, and a weak reference to every member.
+        self._small: dict[str, bytes] = {}
+        self._members: weakref.WeakValueDictionary[
+            str, tempfile.SpooledTemporaryFile[bytes]
+        ] = weakref.WeakValueDictionary()
+        # separate handle for rereading dropped link targets
+        self._archive: BinaryIO | None = None
+        self._index: list[tuple[int, PurePosixPath | None]] | None = None
 
     def close(self) -> None:
         self._tar.close()
-        super().close()
+        self._xz.close()
+        if self._archive is not None:
+            self._archive.close()
+        for fh in list(self._files):
+            fh.close()
 
     def __iter__(self) -> Iterator[Member]:
         while True:
@@ -278,9 +866,35 @@ class TarArchiveReader(ArchiveReader):
             path = PurePath(info.name)
             if info.type == tarfile.DIRTYPE:
                 yield DirMember(path)
-            elif info.type == tarfile.REGTYPE:
-                self._tar.extract(info, self._dir)
-                yield FileMember(path, open(self._dir / path, 'rb'))
+            elif info.type in (tarfile.REGTYPE, tarfile.LNKTYPE):
+                # Members may be used after we've moved on in the stream,
+                # so copy to memory.  Large members spill to an anonymous
+                # temporary file.  Consumers needing a real path call
+                # FileMember.materialize().
+                fh = tempfile.SpooledTemporaryFile(
+                    _SPOOL_SIZE, prefix='openslide-bin-'
+                )
+                if info.type == tarfile.LNKTYPE:
+                    # duplicate contents of an earlier member
+                    self._copy_link(info.linkname, fh)
+                else:
+                    src = self._tar.extractfile(info)
+                    assert src is not None
+                    shutil.copyfileobj(src, fh, _COPY_BUFSIZE)
+                self._files.add(fh)
+                self._members[info.name] = fh
+                size = fh.tell()
+                fh.seek(0)
+                if size <= _LINK_TARGET_CACHE_SIZE:
+                    self._small[info.name] = fh.read()
+                    fh.seek(0)
+                yield FileMember(
+                    path,
+                    cast(BinaryIO, fh),
+                    size=size,
+                    mode=info.mode,
+                    mtime=info.mtime,
+                )
             elif info.type == tarfile.SYMTYPE:
                 yield SymlinkMember(path, PurePath(info.linkname))
             else:
@@ -288,32 +902,226 @@ class TarArchiveReader(ArchiveReader):
                     f'Unsupported member type: {info.type.decode()}'
                 )
 
+    def _copy_link(
+        self, target: str, fh: tempfile.SpooledTemporaryFile[bytes]
+    ) -> None:
+        """Copy the contents of an earlier member to fh."""
+        data = self._small.get(target)
+        if data is not None:
+            fh.write(data)
+            return
+        src = self._members.get(target)
+        if src is not None and not src.closed:
+            pos = src.tell()
+            src.seek(0)
+            shutil.copyfileobj(src, fh, _COPY_BUFSIZE)
+            src.seek(pos)
+            return
+        # The consumer has dropped the target, so read it again from the
+        # archive, and let later links copy from this member instead.
+        if self._archive is None:
+            self._archive = open(self._path, 'rb')
+            self._index = _xz_stream_index(self._archive)
+        with self._extract(
+            self._archive, PurePath(target), self._index
+        ) as extracted:
+            shutil.copyfileobj(extracted, fh, _COPY_BUFSIZE)
+        self._members[target] = fh
+
+    @staticmethod
+    def read_member(fh: BinaryIO, path: PurePath) -> bytes:
+        with TarArchiveReader._extract(fh, path) as src:
+            return src.read()
+
+    @staticmethod
+    @contextmanager
+    def _extract(
+        fh: BinaryIO,
+        path: PurePath,
+        index: list[tuple[int, PurePosixPath | None]] | None = None,
+    ) -> Iterator[IO[bytes]]:
+        """Yield a file object reading a single file member, following
+        hardlinks.  index is the result of a previous _xz_stream_index()
+        call for the file, if available."""
+        # Start decompressing at the last xz Stream which begins with a
+        # member sorting before the requested one.  Older single-Stream
+        # archives are read from the beginning.
+        path = PurePosixPath(path)
+        if index is None:
+            index = _xz_stream_index(fh)
+        start = 0
+        for offset, first in index:
+            if first is not None:
+                if first > path:
+                    break
+                start = offset
+        fh.seek(start)
+        with (
+            lzma.LZMAFile(fh) as xz,
+            tarfile.open(fileobj=xz, mode='r|') as tar,
+        ):
+            for info in tar:
+                if PurePosixPath(info.name) == path:
+                    if info.islnk():
+                        # duplicate contents stored in an earlier member
+                        link = PurePosixPath(info.linkname)
+                        break
+                    src = tar.extractfile(info)
+                    if src is None:
+                        raise Exception(f'{path} is not a file')
+                    with src:
+                        yield src
+                        return
+            else:
+                raise KeyError(f'{path} not found')
+        with TarArchiveReader._extract(fh, link, index) as src:
+            yield src
+
 
 class ZipArchiveReader(ArchiveReader):
     def __init__(self, fh: BinaryIO):
         super().__init__(Path(fh.name))
         self._zip = zipfile.ZipFile(fh)
+        try:
+            self._mmap: mmap.mmap | None = mmap.mmap(
+                fh.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        except (AttributeError, OSError, ValueError):
+            # not a file on disk
+            self._mmap = None
+        self._views: list[memoryview] = []
 
     def close(self) -> None:
         self._zip.close()
-        super().close()
+        if self._mmap is not None:
+            # the mmap can't be closed while views of it exist
+            for view in self._views:
+                view.release()
+            self._mmap.close()
 
     def __iter__(self) -> Iterator[Member]:
         for info in self._zip.infolist():
             path = PurePath(info.filename)
             if info.is_dir():
                 yield DirMember(path)
-            else:
-                yield FileMember(
-                    path, open(self._zip.extract(info, self._dir), 'rb')
+                continue
+            if info.compress_type == zipfile.ZIP_STORED and self._mmap:
+                # zero-copy view of the archive
+                fh: IO[bytes] | _MemoryViewFile = _MemoryViewFile(
+                    self._stored_view(info)
                 )
+            else:
+                # decompress on demand
+                fh = self._zip.open(info)
+            yield FileMember(
+                path,
+                cast(BinaryIO, fh),
+                size=info.file_size,
+                mode=(info.external_attr >> 16) & 0o7777 or None,
+                mtime=time.mktime((*info.date_time, 0, 0, -1)),
+            )
+
+    @staticmethod
+    def read_member(fh: BinaryIO, path: PurePath) -> bytes:
+        # the central directory is already an index
+        with zipfile.ZipFile(fh) as zip:
+            return zip.read(path.as_posix())
+
+    def _stored_view(self, info: zipfile.ZipInfo) -> memoryview:
+        assert self._mmap is not None
+        # the local header has its own filename and extra field lengths
+        offset = info.header_offset
+        if self._mmap[offset : offset + 4] != b'PK\x03\x04':
+            raise Exception(f'Bad local header for {info.filename}')
+        name_len, extra_len = struct.unpack_from(
+            '<HH', self._mmap, offset + 26
+        )
+        start = offset + 30 + name_len + extra_len
+        view = memoryview(self._mmap)[start : start + info.file_size]
+        self._views.append(view)
+        return view
+
+
+class _LazyFile(io.RawIOBase):
+    """Read-only file object for a path, which opens the file on first
+    use.  release() closes the file and rewinds; the next access reopens
+    it.  This keeps the number of open files independent of the number of
+    members."""
+
+    def __init__(self, path: Path):
+        super().__init__()
+        self.path = path
+        self._fh: io.BufferedReader | None = None
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buf: Buffer) -> int:
+        return self._open().readinto(buf)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        return self._open().seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._fh.tell() if self._fh is not None else 0
+
+    def fileno(self) -> int:
+        return self._open().fileno()
+
+    def release(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def close(self) -> None:
+        self.release()
+        super().close()
+
+    def _open(self) -> io.BufferedReader:
+        if self._fh is None:
+            self._fh = self.path.open('rb')
+        return self._fh
+
+
+class _MemoryViewFile(io.RawIOBase):
+    """Read-only file object over a memoryview, without copying it."""
+
+    def __init__(self, view: memoryview):
+        super().__init__()
+        self._view = view
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buf: Buffer) -> int:
+        dest = memoryview(buf).cast('B')
+        count = min(len(dest), len(self._view) - self._pos)
+        dest[:count] = self._view[self._pos : self._pos + count]
+        self._pos += count
+        return count
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._pos
+        elif whence == os.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(offset, 0)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
 
 
 class MemberSet:
-    def __init__(self, members: Sequence[Member | None]):
-        if not all(members):
-            raise Exception('Missing member in one or more archives')
-        self.members = cast(Sequence[Member], members)
+    def __init__(self, members: Sequence[Member]):
+        self.members = members
 
     def __getitem__(self, idx: int) -> Member:
         return self.members[idx]
@@ -325,15 +1133,95 @@ class MemberSet:
     def relpaths(self) -> Sequence[PurePath]:
         return [member.relpath for member in self]
 
-    @cached_property
-    def datas(self) -> Sequence[bytes]:
-        ret = []
-        for member in self:
-            if not isinstance(member, FileMember):
-                raise Exception('Member is not a file')
-            ret.append(member.fh.read())
-            member.fh.seek(0)
-        return ret
+    @property
+    def files(self) -> Sequence[FileMember]:
+        if not all(isinstance(member, FileMember) for member in self):
+            raise Exception('Member is not a file')
+        return cast(Sequence[FileMember], self.members)
+
+    def contents_equal(self) -> bool:
+        """Compare file contents by streaming digest, without reading
+        every member into memory.  Members with different sizes aren't
+        read at all."""
+        files = self.files
+        sizes = {member.stat()[0] for member in files}
+        if len(sizes) > 1:
+            return False
+        digests = {member.digest() for member in files}
+        return len(digests) == 1
+
+
+def _file_digest(fh: BinaryIO) -> bytes:
+    """Hash the contents of a file object and rewind it."""
+    hash = sha256()
+    while buf := fh.read(_COPY_BUFSIZE):
+        hash.update(buf)
+    fh.seek(0)
+    return hash.digest()
+
+
+def _xz_stream_index(fh: BinaryIO) -> list[tuple[int, PurePosixPath | None]]:
+    """Return the offset of each Stream in an xz file, and the path of the
+    tar member whose header starts the Stream, if any."""
+    index = []
+    for offset in _xz_streams(fh):
+        fh.seek(offset)
+        head = lzma.LZMADecompressor().decompress(
+            fh.read(_XZ_PEEK_SIZE), max_length=_XZ_PEEK_SIZE
+        )
+        try:
+            with tarfile.open(fileobj=BytesIO(head), mode='r|') as tar:
+                info = tar.next()
+        except (lzma.LZMAError, tarfile.TarError):
+            # Stream starts in the middle of a member
+            info = None
+        index.append((offset, PurePosixPath(info.name) if info else None))
+    return index
+
+
+def _xz_streams(fh: BinaryIO) -> list[int]:
+    """Return the offset of each Stream in an xz file, walking backward
+    through the Stream Footers and Indexes from the end of the file."""
+
+    def varint(pos: int) -> tuple[int, int]:
+        value = 0
+        shift = 0
+        while True:
+            byte = index[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                return value, pos
+
+    offsets = []
+    pos = fh.seek(0, os.SEEK_END)
+    while pos > 0:
+        fh.seek(pos - 12)
+        footer = fh.read(12)
+        if footer[8:] == b'\0\0\0\0':
+            # Stream Padding
+            pos -= 4
+            continue
+        if len(footer) != 12 or footer[10:] != b'YZ':
+            raise Exception('Bad xz Stream Footer')
+        # Backward Size
+        index_size = (struct.unpack_from('<I', footer, 4)[0] + 1) * 4
+        fh.seek(pos - 12 - index_size)
+        index = fh.read(index_size)
+        if not index or index[0] != 0:
+            raise Exception('Bad xz Index')
+        records, ipos = varint(1)
+        blocks_size = 0
+        for _ in range(records):
+            unpadded, ipos = varint(ipos)
+            _, ipos = varint(ipos)
+            blocks_size += (unpadded + 3) & ~3
+        # Stream Header, Blocks, Index, Stream Footer
+        pos -= 12 + blocks_size + index_size + 12
+        offsets.append(pos)
+    offsets.reverse()
+    return offsets
 
 
 def _path_base(path: Path) -> PurePath:
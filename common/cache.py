@@ -0,0 +1,203 @@
+#
+# Tools for building OpenSlide and its dependencies
+#
+# Copyright (c) 2026 Benjamin Gilbert
+# All rights reserved.
+#
+# This script is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License, version 2.1,
+# as published by the Free Software Foundation.
+#
+# This script is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this script. If not, see <http://www.gnu.org/licenses/>.
+#
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+import hashlib
+import os
+from pathlib import Path
+import re
+import shutil
+import tempfile
+from typing import Self
+
+SOURCE_CACHE_ENV = 'OPENSLIDE_BIN_SOURCE_CACHE'
+SOURCE_CACHE_SIZE_ENV = 'OPENSLIDE_BIN_SOURCE_CACHE_SIZE'
+_DEFAULT_SOURCE_CACHE_SIZE = 2 << 30
+
+
+def parse_size(size: str) -> int:
+    """Parse a size in bytes, with an optional K, M, or G suffix."""
+    match = re.fullmatch('([0-9]+)([KMG]?)', size.strip().upper())
+    if not match:
+        raise ValueError(f'Invalid size: {size}')
+    return int(match[1]) << {'': 0, 'K': 10, 'M': 20, 'G': 30}[match[2]]
+
+
+class ContentCache:
+    """A directory of entries named by key, such as a content hash.  When
+    the cache grows beyond max_size, the least recently used entries are
+    evicted.  Entries are added atomically, so several processes can share
+    a cache.  This class stores a file in each entry; subclasses may store
+    directories."""
+
+    def __init__(self, dir: Path, max_size: int):
+        self.dir = dir
+        self.max_size = max_size
+
+    def get(self, key: str, dest: Path) -> bool:
+        """Copy the file with the specified key to dest.  Return False if
+        it's not in the cache."""
+        path = self.dir / key
+        try:
+            self._copy(path, dest, self._digest(key))
+        except FileNotFoundError:
+            return False
+        except ValueError:
+            # corrupt entry; don't let it be found again
+            path.unlink(missing_ok=True)
+            return False
+        self._touch(path)
+        return True
+
+    def put(self, key: str, src: Path) -> None:
+        """Add a copy of src to the cache under the specified key.  Call
+        evict() afterward to enforce the size limit."""
+        path = self.dir / key
+        if path.exists():
+            self._touch(path)
+            return
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._copy(src, path)
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache fits within
+        its size limit."""
+        if not self.dir.exists():
+            return
+        entries = []
+        for path in self.dir.iterdir():
+            if path.name.startswith('.'):
+                continue
+            try:
+                st = path.stat()
+                if path.is_dir():
+                    size = sum(f.stat().st_size for f in path.iterdir())
+                else:
+                    size = st.st_size
+            except FileNotFoundError:
+                # evicted by another process
+                continue
+            entries.append((st.st_mtime_ns, size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+            total -= size
+
+    def _digest(self, key: str) -> str | None:
+        """Return the SHA-256 digest that the entry with the specified key
+        must have, if the cache is keyed by content."""
+        return None
+
+    @staticmethod
+    def _copy(src: Path, dest: Path, digest: str | None = None) -> None:
+        """Copy src to dest atomically.  If digest is specified, raise
+        ValueError and leave dest untouched if the contents don't have that
+        SHA-256 digest."""
+        with open(src, 'rb') as sfh:
+            fd, temp = tempfile.mkstemp(
+                dir=dest.parent, prefix=f'.{dest.name}.'
+            )
+            try:
+                with os.fdopen(fd, 'wb') as dfh:
+                    hash = hashlib.sha256()
+                    while buf := sfh.read(1 << 20):
+                        hash.update(buf)
+                        dfh.write(buf)
+                if digest is not None and hash.hexdigest() != digest:
+                    raise ValueError(f'Hash mismatch: {src}')
+                os.replace(temp, dest)
+            except BaseException:
+                os.unlink(temp)
+                raise
+
+    @staticmethod
+    def _touch(path: Path) -> None:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # evicted by another process
+            pass
+
+
+class SourceCache(ContentCache):
+    """A cache of subproject source archives, keyed by SHA-256 digest, which
+    can be shared between checkouts.  Entries are verified when they're
+    read, and corrupt ones are deleted."""
+
+    @classmethod
+    def from_env(cls) -> Self | None:
+        """Return the cache configured by the environment, if any."""
+        dir = os.environ.get(SOURCE_CACHE_ENV)
+        if not dir:
+            return None
+        size = os.environ.get(SOURCE_CACHE_SIZE_ENV)
+        return cls(
+            Path(dir),
+            parse_size(size) if size else _DEFAULT_SOURCE_CACHE_SIZE,
+        )
+
+    def _digest(self, key: str) -> str | None:
+        return key
+
+
+class ArtifactCache(ContentCache):
+    """A cache of build outputs, keyed by a digest of the build inputs.
+    Each entry is a directory of files."""
+
+    def get_files(self, key: str, dest: Path) -> list[Path] | None:
+        """Copy the files in the specified entry into dest, and return their
+        paths.  Return None if the entry isn't in the cache."""
+        entry = self.dir / key
+        try:
+            names = sorted(path.name for path in entry.iterdir())
+            dest.mkdir(parents=True, exist_ok=True)
+            for name in names:
+                self._copy(entry / name, dest / name)
+        except FileNotFoundError:
+            # missing, or evicted by another process
+            return None
+        self._touch(entry)
+        return [dest / name for name in names]
+
+    def put_files(self, key: str, srcs: Iterable[Path]) -> None:
+        """Add copies of the specified files to the cache as a single entry,
+        then enforce the size limit."""
+        entry = self.dir / key
+        if entry.exists():
+            self._touch(entry)
+            return
+        self.dir.mkdir(parents=True, exist_ok=True)
+        temp = Path(tempfile.mkdtemp(dir=self.dir, prefix=f'.{key}.'))
+        try:
+            for src in srcs:
+                shutil.copy2(src, temp / src.name)
+            temp.rename(entry)
+        except OSError:
+            # if another process added the entry first, use theirs
+            shutil.rmtree(temp)
+            if not entry.exists():
+                raise
+        self.evict()
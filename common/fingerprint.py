@@ -0,0 +1,161 @@
+#
+# Tools for building OpenSlide and its dependencies
+#
+# Copyright (c) 2026 Benjamin Gilbert
+# All rights reserved.
+#
+# This script is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License, version 2.1,
+# as published by the Free Software Foundation.
+#
+# This script is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this script. If not, see <http://www.gnu.org/licenses/>.
+#
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import os
+from pathlib import Path
+import tempfile
+import time
+from types import TracebackType
+from typing import Self, TypedDict
+
+# Files modified this recently might be modified again without changing
+# their mtime, so don't remember their digests
+_RACY_NS = 2 * 10**9
+
+
+class _Entry(TypedDict):
+    stats: list[list[int]]
+    digest: str
+
+
+class FingerprintStore:
+    """A persistent cache of SHA-256 digests of files.  Entries are keyed
+    by path and validated by each file's size, mtime, and inode, so only
+    files which have changed are rehashed.  Several processes can use the
+    same store; if their updates race, some digests may need to be computed
+    again."""
+
+    def __init__(self, path: Path, threads: int | None = None):
+        self.path = path
+        self._threads = threads or os.cpu_count() or 1
+        self._entries: dict[str, _Entry] | None = None
+        self._dirty = False
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.save()
+
+    def digest(self, *paths: Path) -> str:
+        """Return the SHA-256 digest of the concatenated contents of the
+        specified files."""
+        return self.digests([paths])[0]
+
+    def digests(self, inputs: Iterable[Sequence[Path]]) -> list[str]:
+        """For each sequence of files, return the SHA-256 digest of their
+        concatenated contents.  Hash any missing or stale entries in
+        parallel."""
+        entries = self._load()
+        keys = []
+        stats = []
+        misses = []
+        for i, paths in enumerate(inputs):
+            key = '\n'.join(path.absolute().as_posix() for path in paths)
+            stat = [self._stat(path) for path in paths]
+            keys.append(key)
+            stats.append(stat)
+            entry = entries.get(key)
+            if entry is None or entry['stats'] != stat:
+                misses.append(i)
+
+        digests = [
+            entries[key]['digest'] if key in entries else '' for key in keys
+        ]
+        if misses:
+            with ThreadPoolExecutor(
+                min(self._threads, len(misses))
+            ) as executor:
+                results = executor.map(
+                    lambda i: self._hash(keys[i].split('\n')), misses
+                )
+                cutoff = time.time_ns() - _RACY_NS
+                for i, digest in zip(misses, results, strict=True):
+                    digests[i] = digest
+                    if all(stat[1] < cutoff for stat in stats[i]):
+                        entries[keys[i]] = {
+                            'stats': stats[i],
+                            'digest': digest,
+                        }
+                        self._dirty = True
+        return digests
+
+    def save(self) -> None:
+        """Write updated entries to disk, merging them with entries written
+        by other processes and dropping entries for deleted files."""
+        if not self._dirty:
+            return
+        assert self._entries is not None
+        entries = {**self._read(), **self._entries}
+        entries = {
+            key: entry
+            for key, entry in entries.items()
+            if all(os.path.exists(path) for path in key.split('\n'))
+        }
+        # replace atomically, so concurrent readers see a complete file
+        fd, temp = tempfile.mkstemp(
+            dir=self.path.parent, prefix=f'{self.path.name}.'
+        )
+        try:
+            with os.fdopen(fd, 'w') as fh:
+                json.dump(entries, fh, indent=1, sort_keys=True)
+                fh.write('\n')
+            os.replace(temp, self.path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+        self._dirty = False
+
+    def _load(self) -> dict[str, _Entry]:
+        if self._entries is None:
+            self._entries = self._read()
+        return self._entries
+
+    def _read(self) -> dict[str, _Entry]:
+        try:
+            with self.path.open() as fh:
+                entries: dict[str, _Entry] = json.load(fh)
+                return entries
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    @staticmethod
+    def _stat(path: Path) -> list[int]:
+        st = path.stat()
+        return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+    @staticmethod
+    def _hash(paths: Iterable[str]) -> str:
+        hash = hashlib.sha256()
+        for path in paths:
+            with open(path, 'rb') as fh:
+                while buf := fh.read(1 << 20):
+                    hash.update(buf)
+        return hash.hexdigest()
@@ -20,14 +20,21 @@
 from __future__ import annotations
 
 from collections.abc import Iterable, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
 import os
 from pathlib import Path
 import subprocess
-from typing import Any
+import tempfile
+from types import TracebackType
+from typing import Any, Self
+
+from .archive import FileMember
 
 
 def merge_macho(paths: Sequence[Path], outdir: Path) -> Path:
-    outpath = outdir / paths[0].name
+    # merged files with the same name (e.g. a library and its DWARF file)
+    # must not overwrite each other
+    outpath = Path(tempfile.mkdtemp(dir=outdir)) / paths[0].name
     args: list[str | Path] = [
         os.environ.get('LIPO', 'lipo'),
         '-create',
@@ -39,6 +46,39 @@ def merge_macho(paths: Sequence[Path], outdir: Path) -> Path:
     return outpath
 
 
+class MachoMerger:
+    """Merge Mach-O files on a thread pool, while the caller continues
+    with other work.  Identical sets of inputs are only merged once."""
+
+    def __init__(self, outdir: Path, threads: int):
+        self._outdir = outdir
+        self._executor = ThreadPoolExecutor(threads)
+        self._merges: dict[tuple[bytes, ...], Future[Path]] = {}
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self._executor.shutdown()
+
+    def merge(self, members: Sequence[FileMember]) -> Future[Path]:
+        key = tuple(member.digest() for member in members)
+        if key not in self._merges:
+            # the archive readers aren't thread-safe, so copy out the
+            # inputs here
+            self._merges[key] = self._executor.submit(
+                merge_macho,
+                [member.materialize(self._outdir) for member in members],
+                self._outdir,
+            )
+        return self._merges[key]
+
+
 def all_equal(items: Iterable[Any]) -> bool:
     it = iter(items)
     first = next(it)
@@ -109,6 +109,13 @@ class Tool(Software):
     version: str
 
 
+@dataclass
+class WrapArchive:
+    filename: str
+    urls: list[str]
+    sha256: str
+
+
 @dataclass
 class Project(Software):
     license_files: Iterable[str | Callable[[Project], tuple[str, str]]]
@@ -199,6 +206,25 @@ class Project(Software):
     def wrap_dir_name(self) -> str:
         return self.wrap.get('wrap-file', 'directory')
 
+    @property
+    def wrap_archives(self) -> list[WrapArchive]:
+        """Return the source and patch archives used by the wrap."""
+        section = self.wrap['wrap-file']
+        archives = []
+        for kind in 'source', 'patch':
+            filename = section.get(f'{kind}_filename')
+            if filename is None:
+                continue
+            urls = [
+                section[key]
+                for key in (f'{kind}_url', f'{kind}_fallback_url')
+                if key in section
+            ]
+            archives.append(
+                WrapArchive(filename, urls, section[f'{kind}_hash'])
+            )
+        return archives
+
     @cached_property
     def version(self) -> str:
         try:
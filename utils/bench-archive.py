@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+#
+# Tools for building OpenSlide and its dependencies
+#
+# Copyright (c) 2026 Benjamin Gilbert
+# All rights reserved.
+#
+# This script is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License, version 2.1,
+# as published by the Free Software Foundation.
+#
+# This script is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this script. If not, see <http://www.gnu.org/licenses/>.
+#
+
+from __future__ import annotations
+
+import argparse
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+import json
+import os
+from pathlib import Path, PurePath
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from typing import TextIO
+
+from common.archive import (
+    COMPRESSION_PROFILES,
+    ArchiveReader,
+    ArchiveWriter,
+    FileMember,
+    SymlinkMember,
+    TarArchiveReader,
+    TarArchiveWriter,
+    WheelWriter,
+    ZipArchiveReader,
+    ZipArchiveWriter,
+)
+from common.argparse import TypedArgs
+
+
+class Args(TypedArgs):
+    cases: list[str]
+    jobs: int
+    output: TextIO
+    profile: str
+    scale: float
+
+
+@dataclass
+class Case:
+    func: Callable[[], None]
+    # archive written by the benchmark
+    output: Path | None = None
+    # benchmark whose output is read by this one
+    requires: str | None = None
+
+
+@dataclass
+class Result:
+    case: str
+    wall_seconds: float
+    cpu_seconds: float
+    max_rss_bytes: int
+    output_bytes: int | None
+
+
+def elf_like(rng: random.Random, size: int) -> bytes:
+    """Return a blob which compresses roughly like a shared library: runs
+    of incompressible code, repetitive tables, and zero padding."""
+    out = bytearray(b'\x7fELF\x02\x01\x01\x00')
+    while len(out) < size:
+        kind = rng.random()
+        run = rng.randint(1, 64) << 10
+        if kind < 0.5:
+            out += rng.randbytes(run)
+        elif kind < 0.85:
+            word = rng.randbytes(rng.randint(4, 32))
+            out += word * (run // len(word))
+        else:
+            out += bytes(run)
+    return bytes(out[:size])
+
+
+def make_tree(root: Path, scale: float) -> None:
+    """Create a tree shaped like a bdist: a few large libraries and their
+    debug info, headers, and many small license files, some of them
+    duplicates."""
+    rng = random.Random(0)
+    lib = root / 'lib'
+    include = root / 'include' / 'openslide'
+    licenses = root / 'licenses'
+    for dir in lib, include, licenses:
+        dir.mkdir(parents=True)
+    for i in range(4):
+        size = int(rng.randint(4, 16) * scale * (1 << 20))
+        name = f'libdep{i}.so.{i}.0.0'
+        (lib / name).write_bytes(elf_like(rng, size))
+        (lib / f'{name}.debug').write_bytes(elf_like(rng, 3 * size))
+    for i in range(int(40 * scale) or 1):
+        (include / f'header{i}.h').write_text(
+            f'#define OPENSLIDE_HEADER_{i}\n' * rng.randint(10, 400)
+        )
+    texts = [
+        f'License text {i}\n'.encode() * rng.randint(50, 2000)
+        for i in range(20)
+    ]
+    for i in range(int(300 * scale) or 1):
+        dir = licenses / f'project{i}'
+        dir.mkdir()
+        (dir / 'COPYING').write_bytes(rng.choice(texts))
+        (dir / 'AUTHORS').write_bytes(rng.randbytes(rng.randint(100, 4000)))
+
+
+def populate(arc: ArchiveWriter, tree: Path, symlinks: bool) -> None:
+    for path in sorted(tree.iterdir()):
+        arc.add_tree(arc.base, path)
+    if symlinks:
+        for path in sorted((tree / 'lib').glob('*.so.*.0.0')):
+            name = path.name
+            arc.add(
+                SymlinkMember(
+                    arc.base / 'lib' / name.rsplit('.', 2)[0],
+                    PurePath(name),
+                )
+            )
+
+
+def read_all(reader: type[ArchiveReader], path: Path) -> None:
+    with path.open('rb') as fh, reader(fh) as arc:  # type: ignore[arg-type]
+        for member in arc:
+            if isinstance(member, FileMember):
+                while member.fh.read(1 << 20):
+                    pass
+
+
+def read_group(reader: type[ArchiveReader], path: Path) -> None:
+    with (
+        path.open('rb') as fh1,
+        path.open('rb') as fh2,
+        reader.group([fh1, fh2]) as sets,
+    ):
+        for members in sets:
+            if isinstance(members[0], FileMember):
+                if not members.contents_equal():
+                    raise Exception(f'Mismatch: {members.relpaths}')
+
+
+def measure(name: str, func: Callable[[], None]) -> Result:
+    """Run func in a child process, so its resource usage can be measured
+    separately."""
+    start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            func()
+            status = 0
+        except BaseException:
+            traceback.print_exc()
+            status = 1
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(status)
+    _, status, usage = os.wait4(pid, 0)
+    wall = time.perf_counter() - start
+    if os.waitstatus_to_exitcode(status):
+        raise Exception(f'Benchmark {name} failed')
+    # Linux reports kilobytes, macOS bytes
+    rss = usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    return Result(name, wall, usage.ru_utime + usage.ru_stime, rss, None)
+
+
+def git_revision() -> str | None:
+    try:
+        return (
+            subprocess.check_output(
+                ['git', 'describe', '--always', '--dirty'],
+                cwd=Path(__file__).parent,
+                stderr=subprocess.DEVNULL,
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+args = Args(
+    'bench-archive',
+    description='Benchmark archive writers and readers on a synthetic bdist.',
+)
+args.add_arg(
+    '-j',
+    '--jobs',
+    type=int,
+    default=os.cpu_count() or 1,
+    help='number of compression threads',
+)
+args.add_arg(
+    '-o',
+    '--output',
+    type=argparse.FileType('w'),
+    default=sys.stdout,
+    help='output JSON file',
+)
+args.add_arg(
+    '-p',
+    '--profile',
+    choices=COMPRESSION_PROFILES,
+    default='release',
+    help='compression profile',
+)
+args.add_arg(
+    '-s',
+    '--scale',
+    type=float,
+    default=1.0,
+    help='relative size of the synthetic tree',
+)
+args.add_arg(
+    'cases',
+    metavar='case',
+    nargs='*',
+    help='benchmark to run (default: all)',
+)
+args.parse()
+
+with tempfile.TemporaryDirectory(prefix='openslide-bin-') as tempdir:
+    dir = Path(tempdir)
+    tree = dir / 'tree'
+    make_tree(tree, args.scale)
+    tar = dir / 'openslide-bin-1.0.0-linux-x86_64.tar.xz'
+    zip = dir / 'openslide-bin-1.0.0-windows-x64.zip'
+    whl = dir / 'openslide_bin-1.0.0-py3-none-any.whl'
+
+    def write_tar() -> None:
+        with (
+            tar.open('wb') as fh,
+            TarArchiveWriter(
+                fh, threads=args.jobs, profile=args.profile
+            ) as arc,
+        ):
+            populate(arc, tree, symlinks=True)
+
+    def write_zip() -> None:
+        with (
+            zip.open('wb') as fh,
+            ZipArchiveWriter(
+                fh, threads=args.jobs, profile=args.profile
+            ) as arc,
+        ):
+            populate(arc, tree, symlinks=False)
+
+    def write_wheel() -> None:
+        with (
+            whl.open('wb') as fh,
+            WheelWriter(fh, threads=args.jobs, profile=args.profile) as arc,
+        ):
+            for path in sorted(tree.iterdir()):
+                arc.add_tree(arc.datadir, path)
+
+    cases = {
+        'tar-write': Case(write_tar, output=tar),
+        'zip-write': Case(write_zip, output=zip),
+        'wheel-write': Case(write_wheel, output=whl),
+        'tar-read': Case(
+            lambda: read_all(TarArchiveReader, tar), requires='tar-write'
+        ),
+        'zip-read': Case(
+            lambda: read_all(ZipArchiveReader, zip), requires='zip-write'
+        ),
+        'tar-group': Case(
+            lambda: read_group(TarArchiveReader, tar), requires='tar-write'
+        ),
+        'zip-group': Case(
+            lambda: read_group(ZipArchiveReader, zip), requires='zip-write'
+        ),
+    }
+    unknown = set(args.cases) - cases.keys()
+    if unknown:
+        raise Exception(f'Unknown benchmarks: {", ".join(sorted(unknown))}')
+
+    results = []
+    for name, case in cases.items():
+        if args.cases and name not in args.cases:
+            continue
+        if case.requires is not None:
+            # create the input if its writer wasn't benchmarked
+            writer = cases[case.requires]
+            assert writer.output is not None
+            if not writer.output.exists():
+                print(
+                    f'Running {case.requires} to create input...',
+                    file=sys.stderr,
+                    flush=True,
+                )
+                measure(case.requires, writer.func)
+        print(f'Running {name}...', file=sys.stderr, flush=True)
+        result = measure(name, case.func)
+        if case.output is not None:
+            result.output_bytes = case.output.stat().st_size
+        results.append(result)
+
+    report = {
+        'revision': git_revision(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'jobs': args.jobs,
+        'profile': args.profile,
+        'scale': args.scale,
+        'input_bytes': sum(
+            f.stat().st_size for f in tree.rglob('*') if f.is_file()
+        ),
+        'results': [asdict(result) for result in results],
+    }
+
+with args.output:
+    json.dump(report, args.output, indent=2)
+    args.output.write('\n')
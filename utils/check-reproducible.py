@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+#
+# Tools for building OpenSlide and its dependencies
+#
+# Copyright (c) 2026 Benjamin Gilbert
+# All rights reserved.
+#
+# This script is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License, version 2.1,
+# as published by the Free Software Foundation.
+#
+# This script is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this script. If not, see <http://www.gnu.org/licenses/>.
+#
+
+from __future__ import annotations
+
+from hashlib import sha256
+from io import BytesIO
+import os
+from pathlib import Path, PurePath
+import random
+import tempfile
+import time
+import zipfile
+
+from common.archive import (
+    COMPRESSION_PROFILES,
+    FileMember,
+    SymlinkMember,
+    TarArchiveWriter,
+    WheelWriter,
+    ZipArchiveWriter,
+)
+from common.argparse import TypedArgs
+
+# 2024-01-01T00:00:00Z
+EPOCH = 1704067200
+
+
+class Args(TypedArgs):
+    jobs: int
+    profile: str
+
+
+def make_tree(root: Path, mtime: float, reverse: bool) -> None:
+    """Create a tree shaped like a bdist, with duplicate files and a mix
+    of permissions, large enough for a multi-Stream tar.xz.  Create the
+    files in the specified order, so the two trees may list their
+    directories differently, and set all mtimes to the specified time."""
+    rng = random.Random(0)
+    files = [
+        (
+            PurePath('lib/libopenslide.so.1'),
+            rng.randbytes(4 << 10) * 3072,
+            0o755,
+        ),
+        (PurePath('lib/libdep.so.1'), rng.randbytes(1 << 20), 0o755),
+        (PurePath('include/openslide.h'), b'#define OPENSLIDE\n' * 100, 0o644),
+        (PurePath('bin/slidetool'), rng.randbytes(100 << 10), 0o755),
+    ]
+    text = b'License text\n' * 500
+    for i in range(20):
+        files.append((PurePath(f'licenses/project{i}/COPYING'), text, 0o644))
+    # same contents as a license file, different mode
+    files.append((PurePath('bin/copying'), text, 0o755))
+    for relpath, data, mode in reversed(files) if reverse else files:
+        path = root / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        path.chmod(mode)
+    for path in root.rglob('*'):
+        os.utime(path, (mtime, mtime))
+
+
+def build(dir: Path, tree: Path, tz: str, threads: int) -> dict[str, str]:
+    """Write a tar, Zip, and wheel from the tree in the specified time
+    zone, check that the Zips are readable, and return the SHA-256 digest
+    of each."""
+    os.environ['TZ'] = tz
+    time.tzset()
+    dir.mkdir()
+    tar = dir / 'openslide-bin-1.0.0-linux-x86_64.tar.xz'
+    zip = dir / 'openslide-bin-1.0.0-windows-x64.zip'
+    whl = dir / 'openslide_bin-1.0.0-py3-none-any.whl'
+    generated = b'generated member\n'
+    with (
+        tar.open('wb') as fh,
+        TarArchiveWriter(fh, threads=threads, profile=args.profile) as arc,
+    ):
+        for path in sorted(tree.iterdir()):
+            arc.add_tree(arc.base, path)
+        arc.add(FileMember(arc.base / 'VERSION', BytesIO(generated)))
+        arc.add(
+            SymlinkMember(
+                arc.base / 'lib' / 'libopenslide.so',
+                PurePath('libopenslide.so.1'),
+            )
+        )
+    with (
+        zip.open('wb') as fh,
+        ZipArchiveWriter(fh, threads=threads, profile=args.profile) as arc,
+    ):
+        for path in sorted(tree.iterdir()):
+            arc.add_tree(arc.base, path)
+        arc.add(FileMember(arc.base / 'VERSION', BytesIO(generated)))
+    with (
+        whl.open('wb') as fh,
+        WheelWriter(fh, threads=threads, profile=args.profile) as arc,
+    ):
+        for path in sorted(tree.iterdir()):
+            arc.add_tree(arc.datadir, path)
+        arc.add(FileMember(arc.metadir / 'WHEEL', BytesIO(generated)))
+    # ZipArchiveWriter relies on zipfile internals; make sure the result
+    # can be read back
+    for path in zip, whl:
+        with zipfile.ZipFile(path) as zf:
+            bad = zf.testzip()
+        if bad is not None:
+            raise Exception(f'Corrupt member in {path.name}: {bad}')
+    digests = {}
+    for path in tar, zip, whl:
+        with path.open('rb') as rfh:
+            digests[path.suffix] = sha256(rfh.read()).hexdigest()
+    return digests
+
+
+args = Args(
+    'check-reproducible',
+    description=(
+        'Build archives twice from copies of a synthetic tree, with '
+        'different mtimes, time zones, and thread counts, and check that '
+        'the outputs are identical.'
+    ),
+)
+args.add_arg(
+    '-j',
+    '--jobs',
+    type=int,
+    default=max(os.cpu_count() or 1, 2),
+    help='number of compression threads for the second build',
+)
+args.add_arg(
+    '-p',
+    '--profile',
+    choices=COMPRESSION_PROFILES,
+    default='fast',
+    help='compression profile',
+)
+args.parse()
+
+os.environ['SOURCE_DATE_EPOCH'] = str(EPOCH)
+with tempfile.TemporaryDirectory(prefix='openslide-bin-') as tempdir:
+    dir = Path(tempdir)
+    # both mtimes are clamped to SOURCE_DATE_EPOCH
+    make_tree(dir / 'tree1', EPOCH + 86400, reverse=False)
+    make_tree(dir / 'tree2', EPOCH + 7 * 86400 + 3600, reverse=True)
+    first = build(dir / 'out1', dir / 'tree1', 'UTC', 1)
+    second = build(dir / 'out2', dir / 'tree2', 'NZST-12', args.jobs)
+
+for kind, digest in first.items():
+    print(f'{kind}: {digest}')
+mismatched = sorted(kind for kind in first if first[kind] != second[kind])
+if mismatched:
+    raise Exception(f'Archives not reproducible: {", ".join(mismatched)}')
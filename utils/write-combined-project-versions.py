@@ -24,10 +24,9 @@ import argparse
 import json
 from pathlib import Path
 import sys
-import tarfile
 from typing import BinaryIO, TextIO
-import zipfile
 
+from common.archive import ArchiveReader, TarArchiveReader, ZipArchiveReader
 from common.argparse import TypedArgs
 from common.dist import BDistName
 from common.software import Info, Infos, write_version_markdown
@@ -61,18 +60,12 @@ args.parse()
 infos: dict[tuple[str | None, str], Info] = {}
 for fh in args.bdists:
     name = BDistName(Path(fh.name).name)
-    verfile = (name.base / 'versions.json').as_posix()
-    if name.format == 'zip':
-        with zipfile.ZipFile(fh) as zip:
-            with zip.open(verfile) as zmember:
-                contents: Infos = json.load(zmember)
-    else:
-        with tarfile.open(fileobj=fh) as tar:
-            tmember = tar.extractfile(tar.getmember(verfile))
-            if tmember is None:
-                raise Exception(f'{verfile} is not a file')
-            with tmember:
-                contents = json.load(tmember)
+    reader: type[ArchiveReader] = (
+        ZipArchiveReader if name.format == 'zip' else TarArchiveReader
+    )
+    contents: Infos = json.loads(
+        reader.read_member(fh, name.base / 'versions.json')
+    )
 
     for info in contents['versions']:
         id, typ, version = info['id'], info['type'], info['version']
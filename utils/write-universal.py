@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+#
+# Tools for building OpenSlide and its dependencies
+#
+# Copyright (c) 2023 Benjamin Gilbert
+# All rights reserved.
+#
+# This script is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License, version 2.1,
+# as published by the Free Software Foundation.
+#
+# This script is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this script. If not, see <http://www.gnu.org/licenses/>.
+#
+
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import Future
+from contextlib import ExitStack
+from email.parser import BytesParser
+from email.policy import compat32
+from io import BytesIO
+import os
+from pathlib import Path, PurePath
+import tempfile
+from typing import BinaryIO, cast
+
+from common.archive import (
+    COMPRESSION_PROFILES,
+    ArchiveWriter,
+    DirMember,
+    FileMember,
+    Member,
+    MemberSet,
+    SymlinkMember,
+    TarArchiveReader,
+    TarArchiveWriter,
+    WheelWriter,
+    ZipArchiveReader,
+)
+from common.argparse import TypedArgs
+from common.macos import MachoMerger, all_equal
+
+DSYM_ARCHES = frozenset(('aarch64', 'x86_64'))
+MACHO_MAGIC = b'\xcf\xfa\xed\xfe'
+
+
+class Args(TypedArgs):
+    bdist: BinaryIO
+    bdists: list[BinaryIO]
+    jobs: int
+    profile: str
+    wheel: BinaryIO
+    wheels: list[BinaryIO]
+
+
+def dsym_key(member: Member) -> PurePath:
+    # match dSYM relocation members from different arches
+    return PurePath(
+        *(
+            '{arch}' if part in DSYM_ARCHES else part
+            for part in member.relpath.parts
+        )
+    )
+
+
+def type_of(members: MemberSet) -> type | None:
+    if all_equal(type(m) for m in members):
+        return type(members[0])
+    return None
+
+
+def add_bdist_members(
+    out: TarArchiveWriter,
+    members: MemberSet,
+    merger: MachoMerger,
+    merges: list[tuple[ArchiveWriter, PurePath, Future[Path]]],
+) -> None:
+    all_type = type_of(members)
+    if not all_equal(members.relpaths):
+        # dSYM relocations, matched by dsym_key()
+        if all_type in (DirMember, FileMember):
+            for member in members:
+                out.add(member.with_base(out.base))
+        else:
+            raise Exception(
+                f'Unknown/mismatched types for relocations: {members.relpaths}'
+            )
+    elif all_type is DirMember or (
+        all_type is SymlinkMember
+        and all_equal(cast(SymlinkMember, m).target for m in members)
+    ):
+        out.add(members[0].with_base(out.base))
+    elif all_type is FileMember:
+        if members.files[0].peek(4) == MACHO_MAGIC:
+            merges.append(
+                (
+                    out,
+                    out.base / members[0].relpath,
+                    merger.merge(members.files),
+                )
+            )
+        elif members.contents_equal():
+            out.add(members[0].with_base(out.base))
+        else:
+            raise Exception(f'Contents mismatch: {members.relpaths}')
+    else:
+        raise Exception(f'Unknown/mismatched types: {members.relpaths}')
+
+
+def add_wheel_members(
+    whl: WheelWriter,
+    members: MemberSet,
+    merger: MachoMerger,
+    merges: list[tuple[ArchiveWriter, PurePath, Future[Path]]],
+) -> None:
+    all_type = type_of(members)
+    if all_type is DirMember:
+        whl.add(members[0])
+    elif all_type is FileMember:
+        if members.files[0].peek(4) == MACHO_MAGIC:
+            merges.append((whl, members[0].path, merger.merge(members.files)))
+        elif members[0].path.name == 'RECORD':
+            # regenerated by WheelWriter
+            pass
+        elif members[0].path.name == 'WHEEL':
+            meta = BytesParser(policy=compat32).parse(members.files[0].fh)
+            del meta['Tag']
+            meta['Tag'] = whl.tag
+            whl.add(FileMember(members[0].path, BytesIO(meta.as_bytes())))
+        elif members.contents_equal():
+            whl.add(members[0])
+        else:
+            raise Exception(f'Contents mismatch: {members.relpaths}')
+    else:
+        raise Exception(f'Unknown/mismatched types: {members.relpaths}')
+
+
+args = Args(
+    'write-universal',
+    description='Write macOS universal bdist archive and Python wheel.',
+)
+args.add_arg(
+    '-j',
+    '--jobs',
+    type=int,
+    default=os.cpu_count() or 1,
+    help='number of compression and merge threads',
+)
+args.add_arg(
+    '-p',
+    '--profile',
+    choices=COMPRESSION_PROFILES,
+    default='release',
+    help='compression profile',
+)
+args.add_arg(
+    '--bdist',
+    type=argparse.FileType('wb'),
+    required=True,
+    help='output bdist archive',
+)
+args.add_arg(
+    '--wheel',
+    type=argparse.FileType('wb'),
+    required=True,
+    help='output wheel',
+)
+args.add_arg(
+    '--bdists',
+    metavar='bdist',
+    nargs='+',
+    type=argparse.FileType('rb'),
+    required=True,
+    help='input bdist archive',
+)
+args.add_arg(
+    '--wheels',
+    metavar='wheel',
+    nargs='+',
+    type=argparse.FileType('rb'),
+    required=True,
+    help='input wheel',
+)
+args.parse()
+
+with ExitStack() as stack:
+    tempdir = Path(
+        stack.enter_context(
+            tempfile.TemporaryDirectory(prefix='openslide-bin-')
+        )
+    )
+    # readers must stay open until the writers are closed
+    bdist_sets = stack.enter_context(
+        TarArchiveReader.group(args.bdists, key=dsym_key)
+    )
+    wheel_sets = stack.enter_context(ZipArchiveReader.group(args.wheels))
+    out = stack.enter_context(
+        TarArchiveWriter(args.bdist, threads=args.jobs, profile=args.profile)
+    )
+    whl = stack.enter_context(
+        WheelWriter(args.wheel, threads=args.jobs, profile=args.profile)
+    )
+    # run lipo in the background while we process other members.  The
+    # wheel contains the same Mach-O files as the bdist, so most of its
+    # merges are reused.
+    merger = stack.enter_context(MachoMerger(tempdir, args.jobs))
+    merges: list[tuple[ArchiveWriter, PurePath, Future[Path]]] = []
+
+    for members in bdist_sets:
+        add_bdist_members(out, members, merger, merges)
+    for members in wheel_sets:
+        add_wheel_members(whl, members, merger, merges)
+
+    for arc, path, future in merges:
+        arc.add(FileMember.from_path(path, future.result()))
+for arc in out, whl:
+    if arc.dedup_count:
+        print(arc.dedup_report())